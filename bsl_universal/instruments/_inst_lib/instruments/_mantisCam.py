@@ -13,18 +13,25 @@ try:
     import zmq
 except ImportError:
     pass
-import enum, sys, os, atexit, time
+import enum, sys, os, atexit, time, math
 logger_opt = logger.opt(ansi=True)
 
+_LOG_DIR = os.path.join(os.path.expanduser('~'), 'MantisCam', 'AutoRecord', 'logs')
+
 class MantisCamCtrl:
     TIMEOUT_SEC = 60
     __ZMQ_CMD_DELAY = 0.01
+    __ZMQ_POLL_MS = 100
+    __ZMQ_RECORD_POLL_MS = 1000
+    __ZMQ_DRAIN_MAX = 64
+    __ZMQ_VID_RCVHWM = 4
+    __GSENSE_SETTLE_FRAMES = 3
 
     class FILE_SAVING_MODE(enum.Enum):
         CUSTOM = "Custom"; TIMSSTAMP = "Timestamp"
 
     def __init__(self, device_sn="", port_cmd_pub: int=60000, port_cmd_sub: int=60001, port_vid_sub: int=60011, *, log_level: str = "TRACE", is_GSENSE: bool = False):
-        logger_opt.info(f"Initiating bsl_instrument - MantisCam({device_sn})...")
+        logger_opt.info("Initiating bsl_instrument - MantisCam({})...", device_sn)
         url_prefix = 'tcp://127.0.0.1:'
 
         self.url_cmd_pub = url_prefix + str(port_cmd_pub)
@@ -33,16 +40,21 @@ class MantisCamCtrl:
         
         self.log_level = log_level
         self.is_recording = False
-        self.__e_exp_time = 50
-        self.__e_exp_matched = False
+        self.__record_started = False
+        self.__record_deadline = 0
+        self.__set_expected_exposure(50)
         self.__is_GSENSE = is_GSENSE
+        self.__n_raw_frames = 0
         
         self.cur_exp_time_ms = 0
 
         self.__logger_init()
         self.__zmq_init()
+        # Give the command PUB time to get the GUI's subscriptions before the first commands that are not
+        #   verified afterwards (file name), PUB/SUB silently drops publishes sent before that. A frame on
+        #   the video SUB doesn't tell anything about the command path, so this stays a fixed delay.
         time.sleep(1)
-        logger.success(f"Camera - ZMQ interface connected, camera initlized!")
+        logger.success("Camera - ZMQ interface connected, camera initlized!")
         self.set_file_name(time_stamp_only=True)
         self.set_exposure_ms(50)
         return
@@ -52,131 +64,193 @@ class MantisCamCtrl:
         # Initialize ZMQ for receiving video metadata and command, and send commands
         self.ctx = zmq.Context()
         self.cmd = Messenger(self.ctx, self.url_cmd_pub, self.url_cmd_sub, 'cmd', '')
-        self.vid = Messenger(self.ctx, None, self.url_vid_sub, 'vid', '')
+        self.__zmq_vid_connect()
         # We register ther termination function so we don't have to explicitly call it upon normal and abnormal termination
         atexit.register(self.__zmq_term)
         self.poller = zmq.Poller()
         self.poller.register(self.cmd.skt_sub, zmq.POLLIN)
         self.poller.register(self.vid.skt_sub, zmq.POLLIN)
-        self.__zmq_send('cam', 'exp-00', dict([('exp-00', self.__e_exp_time)]))
-        self.__zmq_send('widget', 'exp-00', dict([('exp-00', self.__e_exp_time)]))
-        logger.success(f"Command PUB [{self.url_cmd_pub}] SUB [{self.url_cmd_sub}]")
-        logger.success(f"Video SUB [{self.url_vid_sub}]")
+        # Handler for each polled socket, __zmq_recv dispatches on the sockets poll reports as ready
+        self.__zmq_handlers = {self.cmd.skt_sub: self.__zmq_handle_cmd, self.vid.skt_sub: self.__zmq_handle_vid}
+        # Give the freshly connected sockets one command delay to join before the first publish, this
+        #   exposure is sent again and verified by set_exposure_ms once __init__ waited for the join
+        time.sleep(self.__ZMQ_CMD_DELAY)
+        exp_msg = {'exp-00': self.__e_exp_time}
+        self.__zmq_send_batch([('cam', 'exp-00', exp_msg), ('widget', 'exp-00', exp_msg)])
+        logger.success("Command PUB [{}] SUB [{}]", self.url_cmd_pub, self.url_cmd_sub)
+        logger.success("Video SUB [{}]", self.url_vid_sub)
 
 
     def __zmq_term(self):
         self.cmd.close()
         self.vid.close()
         self.ctx.term()
-        logger.trace(f"ZMQ terminated.")
+        logger.trace("ZMQ terminated.")
+
+    def __zmq_vid_connect(self):
+        # Only keep a few video messages queued on our end, we only read frame metadata and raw frames
+        #   can be several MB each. RCVHWM has to be set before the socket connects and Messenger
+        #   connects on construction, so apply it as a context default only while creating the socket.
+        self.ctx.setsockopt(zmq.RCVHWM, self.__ZMQ_VID_RCVHWM)
+        try:
+            self.vid = Messenger(self.ctx, None, self.url_vid_sub, 'vid', '')
+        finally:
+            self.ctx.sockopts.pop(zmq.RCVHWM, None)
 
     def __zmq_vid_reset(self):
+        # Throw away the queued frames by reconnecting. Draining our end isn't enough: while we don't read,
+        #   the backlog piles up in the publisher's queue for this subscriber and in the TCP buffers, and
+        #   would arrive right after a drain. Closing the socket drops all of it.
+        self.poller.unregister(self.vid.skt_sub)
+        del self.__zmq_handlers[self.vid.skt_sub]
         self.vid.close()
-        self.vid = Messenger(self.ctx, None, self.url_vid_sub, 'vid', '')
+        self.__zmq_vid_connect()
         self.poller.register(self.vid.skt_sub, zmq.POLLIN)
-        logger.trace(f"Video socket reset.")
+        self.__zmq_handlers[self.vid.skt_sub] = self.__zmq_handle_vid
+        logger.trace("Video socket reset.")
 
 
-    def __zmq_update_mean(self, desired_frame_name: str, sub_frame_type:str='') -> float:
-        skts = dict(self.poller.poll(timeout=0))
-                        
-        if self.vid.skt_sub in skts:
+    def __zmq_update_mean(self, desired_frame_name: str, sub_frame_type:str='', timeout_ms: int = 0) -> float:
+        # Only frames matter here, so block on the video socket alone, pending command messages would
+        #   otherwise wake the poll up without anything to read. After the first wait, keep going through
+        #   the frames that are already queued until one matches, rather than returning after each one.
+        for _ in range(self.__ZMQ_DRAIN_MAX):
+            if not self.vid.skt_sub.poll(timeout=timeout_ms, flags=zmq.POLLIN):
+                break
+            timeout_ms = 0
             topic, name, msg, frame_dump = self.vid.peak_frame()
-            logger.trace(f"Topic '{topic}' received.")
-
-            if topic != 'isp':
-                return -1
-            if 'frame_name' not in msg:
-                return -1
-            if msg['frame_name'] != desired_frame_name:
-                return -1
-            
-            frame_name = msg['frame_name']
-            logger.trace(f"Received frame {frame_name}.")
-
-            if 'statistics' not in msg:
-                logger.trace(f"    No statistics in the frame.")
-                return -1
-            if frame_name != desired_frame_name:
-                logger.trace(f"    Frame name not match.")
-                return -1
-            if 'frame-mean' not in msg['statistics']:
-                logger.trace(f"    No frame mean in the frame.")
-                return -1
-            
-            if sub_frame_type != '':
-                sub_frame_type = "frame-mean-" + sub_frame_type
-                if sub_frame_type not in msg['statistics']:
-                    return -1
-                logger.trace(f"    Received frame mean {msg['statistics'][sub_frame_type]} with sub-frame-type {sub_frame_type}.")
-                return msg['statistics'][sub_frame_type]
-
-            logger.trace(f"    Received frame mean {msg['statistics']['frame-mean']}.")
-            return msg['statistics']['frame-mean']
+            logger.trace("Topic '{}' received.", topic)
+
+            if topic != 'isp' or msg.get('frame_name') != desired_frame_name:
+                continue
+            logger.trace("Received frame {}.", desired_frame_name)
+
+            # Build the keys outside the try, a bad sub_frame_type has to raise instead of being taken
+            #   for a frame without statistics
+            if isinstance(sub_frame_type, (list, tuple)):
+                keys = ["frame-mean-" + x for x in sub_frame_type]
+            else:
+                key = "frame-mean-" + sub_frame_type if sub_frame_type != '' else 'frame-mean'
+
+            # Frames of the requested name normally carry the statistics, so index directly and only
+            #   pay for the exception on the rare frame without them
+            try:
+                stats = msg['statistics']
+                if isinstance(sub_frame_type, (list, tuple)):
+                    # Several sub-frame means read from the same frame
+                    means = np.array([stats[x] for x in keys])
+                    logger.trace("    Received frame means {} with sub-frame-types {}.", means, sub_frame_type)
+                    return means
+
+                mean = stats[key]
+            except (KeyError, TypeError):
+                logger.trace("    No matching statistics in the frame.")
+                continue
+            logger.trace("    Received frame mean {} with key {}.", mean, key)
+            return mean
         
-        time.sleep(self.__ZMQ_CMD_DELAY)
         return -1
 
 
 
-    def __zmq_recv(self):
-        skts = dict(self.poller.poll(timeout=0))
-        if self.cmd.skt_sub in skts:
-            topic, name, msg = self.cmd.recv()
-            if topic == 'file':
-                if name == 'recording_status':
-                    self.is_recording = msg['recording']
-                        
-        if self.vid.skt_sub in skts:
-            # We always need to peak frame, because otherwise it will queue up in our receiving end
-            topic, name, msg, frame_dump = self.vid.peak_frame()
-            # If user hit run button (self.procedure_run), and we are waiting for exposure to match (that's why we need
-            #   to read frame metadata at first place: see if the incoming frame exposure match our set exposure), and
-            #   we are not waiting for complete. This limits the checking phase to the Smart mode, and only the period
-            #   after set exposure and before start recording
-
-            if topic == 'raw':
-                if 'frame_meta' in msg:
-                    if 'int-set' in msg['frame_meta']:
-                        received_exposure_ms = float(msg['frame_meta']['int-set'])
-                        logger.trace(f"Received frame exposure {received_exposure_ms}, expected frame exposure {self.__e_exp_time}.")
-                        # If match, we procede to the next phase: recording
-                        if self.__e_exp_time <1:
-                            if (received_exposure_ms < (self.__e_exp_time * 1.2)) and (received_exposure_ms > (self.__e_exp_time * 0.8)):
-                                self.__e_exp_matched = True 
-                        else:
-                            if (received_exposure_ms < (self.__e_exp_time * 1.05)) and (received_exposure_ms > (self.__e_exp_time * 0.95)):
-                                self.__e_exp_matched = True 
-
-                        if self.__is_GSENSE:
-                            self.__e_exp_matched = True
-        time.sleep(self.__ZMQ_CMD_DELAY)
+    def __zmq_recv(self, timeout_ms: int = 0):
+        # Block up to timeout_ms for the first message, then drain what is already queued on both
+        #   sockets without waiting again, so a burst of messages is consumed in one call. The drain is
+        #   bounded so a publisher faster than us cannot keep the caller from checking its deadline.
+        for _ in range(self.__ZMQ_DRAIN_MAX):
+            events = self.poller.poll(timeout=timeout_ms)
+            if not events:
+                break
+            timeout_ms = 0
+
+            for skt, _ in events:
+                self.__zmq_handlers[skt]()
+
+    def __zmq_handle_cmd(self):
+        topic, name, msg = self.cmd.recv()
+        if topic == 'file':
+            if name == 'recording_status':
+                self.is_recording = bool(msg['recording'])
+                # Latch the start, a short recording can start and finish within one __zmq_recv drain
+                if self.is_recording:
+                    self.__record_started = True
+
+    def __zmq_handle_vid(self):
+        # We always need to peak frame, because otherwise it will queue up in our receiving end
+        topic, name, msg, frame_dump = self.vid.peak_frame()
+        # If user hit run button (self.procedure_run), and we are waiting for exposure to match (that's why we need
+        #   to read frame metadata at first place: see if the incoming frame exposure match our set exposure), and
+        #   we are not waiting for complete. This limits the checking phase to the Smart mode, and only the period
+        #   after set exposure and before start recording
+
+        if topic == 'raw':
+            self.__n_raw_frames += 1
+            # Once the exposure is matched the metadata is of no interest until the next change
+            if not self.__e_exp_matched:
+                if self.__is_GSENSE:
+                    # GSENSE frames don't report a usable exposure, any new raw frame is a match and
+                    #   set_exposure_ms waits for a few more frames to settle
+                    self.__e_exp_matched = True
+                elif 'frame_meta' in msg and 'int-set' in msg['frame_meta']:
+                    received_exposure_ms = float(msg['frame_meta']['int-set'])
+                    logger.trace("Received frame exposure {}, expected frame exposure {}.", received_exposure_ms, self.__e_exp_time)
+                    # If match, we procede to the next phase: recording
+                    if self.__e_exp_lo < received_exposure_ms < self.__e_exp_hi:
+                        self.__e_exp_matched = True 
+
+    def __set_expected_exposure(self, exp_time_ms: float):
+        # Set the exposure incoming frames are verified against, along with its match window (wider for
+        #   sub-millisecond exposures), so __zmq_recv only does two compares per raw frame
+        self.__e_exp_time = exp_time_ms
+        if exp_time_ms < 1:
+            self.__e_exp_lo, self.__e_exp_hi = exp_time_ms * 0.8, exp_time_ms * 1.2
+        else:
+            self.__e_exp_lo, self.__e_exp_hi = exp_time_ms * 0.95, exp_time_ms * 1.05
+        self.__e_exp_matched = False
+
+    def __zmq_wait_raw_frames(self, n_frames: int, timeout_s: float) -> bool:
+        # Wait until n_frames more raw frames are received, returns False if timed out first
+        target_n_frames = self.__n_raw_frames + n_frames
+        deadline = time.monotonic() + timeout_s
+        while self.__n_raw_frames < target_n_frames:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0:
+                return False
+            self.__zmq_recv(timeout_ms=min(remaining_ms, self.__ZMQ_POLL_MS))
+        return True
 
     def __zmq_send(self, topic: str, name: str, msg: Any):
         # Abstracted zmq command send with logging
-        logger.trace(f"Sending t:n:m={topic}:{name}:{msg}")
+        logger.trace("Sending t:n:m={}:{}:{}", topic, name, msg)
         self.cmd.send(name, msg, topic=topic)
-        time.sleep(self.__ZMQ_CMD_DELAY)
+
+    def __zmq_send_batch(self, msgs: list):
+        # Send a list of (topic, name, msg) commands back-to-back on the command socket
+        for topic, name, msg in msgs:
+            logger.trace("Sending t:n:m={}:{}:{}", topic, name, msg)
+            self.cmd.send(name, msg, topic=topic)
 
 
     def __logger_init(self):
-        home_dir = os.path.expanduser('~')
+        time_now = datetime.now(timezone.utc)
+        log_name = time_now.strftime('%Y-%m-%d_%H-%M-%S_') + f"{time_now.microsecond//1000:03d}.log"
         # Log to file and terminal at the same time
         logger.remove()
-        logger.add(os.path.join(home_dir, 'MantisCam', 'AutoRecord', 'logs', datetime.now(timezone.utc).strftime('%Y-%m-%d_%H-%M-%S_%f')[:-3]+'.log'), 
+        # Every ZMQ poll traces to the file, so roll it over and compress old parts instead of letting a
+        #   long session grow one unbounded log
+        logger.add(os.path.join(_LOG_DIR, log_name), 
                         enqueue=True, level=0, backtrace=True, diagnose=True,
+                        rotation="50 MB", compression="gz",
                         format="{time:YYYY-MM-DD HH:mm:ss.SSSZZ} | {process: <5} | {level: <8} | {file}:{function}:{line} > {message}")
+        # The terminal sink is written in-process: stdout writes are cheap, while enqueue would pickle
+        #   every record through a multiprocessing queue. Variable dumps on errors stay in the log file,
+        #   and so does the full date and UTC offset, the terminal only shows the local time of day.
         logger.add(sys.stdout, 
-                        enqueue=True, level=self.log_level, backtrace=True, diagnose=True,
-                        format="<green>{time:YYYY-MM-DD HH:mm:ss.SSSZZ}</green> | <magenta>{process: <5}</magenta> | <level>{level: <8}</level> | <blue>{file}:{function}:{line}</blue> > <level>{message}</level>")
+                        level=self.log_level, backtrace=True, diagnose=False,
+                        format="<green>{time:HH:mm:ss.SSS}</green> | <magenta>{process: <5}</magenta> | <level>{level: <8}</level> | <blue>{file}:{function}:{line}</blue> > <level>{message}</level>")
         atexit.register(self.__logger_term)
 
 
-    def __set_frames_per_file(self, frames: int):
-        # Send frames per file value to the file saving process
-        self.__zmq_send('file', 'frames_per_file', dict(frames_per_file=frames))
-
-    
     def get_frame_mean_gs_hg(self, timeout_ms:int = 5000) -> float:
         """
         - Get the mean value of the High Gain frame.
@@ -228,10 +302,12 @@ class MantisCamCtrl:
             (default to 5000)
             Timeout in milliseconds for the function to wait for the frame to be received.
 
-        sub_frame_type : `str`
+        sub_frame_type : `str` or `list`
             (default to '')
             Sub-frame type to get the mean value from.
             Options: 'red', 'green', 'blue'
+            A list of sub-frame types (e.g. ['red', 'green', 'blue']) reads all of them from the
+            same frame and returns them as a `np.ndarray` in the same order.
 
         Returns
         -------
@@ -240,16 +316,18 @@ class MantisCamCtrl:
         """
         self.__zmq_vid_reset()
         self.__zmq_recv()
-        time_start = time.time() 
+        deadline = time.monotonic() + timeout_ms/1000
         while True:
-            mean = self.__zmq_update_mean(desired_frame_name=frame_name, sub_frame_type=sub_frame_type)
-            if isinstance(mean != -1, np.ndarray):
-                if all(x != -1 for x in mean):
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            mean = self.__zmq_update_mean(desired_frame_name=frame_name, sub_frame_type=sub_frame_type,
+                                          timeout_ms=min(max(remaining_ms, 0), self.__ZMQ_POLL_MS))
+            if isinstance(mean, np.ndarray):
+                if np.all(mean != -1):
                     return mean
             elif mean != -1:
                 return mean
-            if time.time() - time_start > timeout_ms/1000:
-                logger.error(f"ERROR - Unable to receive {frame_name} frame, timed out!")
+            if time.monotonic() > deadline:
+                logger.error("ERROR - Unable to receive {} frame, timed out!", frame_name)
                 raise bsl_type.DeviceTimeOutError
 
     
@@ -265,28 +343,31 @@ class MantisCamCtrl:
         """
 
         # Helper function to set camera and GUI exposure values
-        self.__zmq_send('cam', 'exp-00', dict([('exp-00', exp_time_ms)]))
-        self.__zmq_send('widget', 'exp-00', dict([('exp-00', exp_time_ms)]))
+        exp_msg = {'exp-00': exp_time_ms}
+        self.__zmq_send_batch([('cam', 'exp-00', exp_msg), ('widget', 'exp-00', exp_msg)])
         cur_exp_time = self.__e_exp_time
-        self.__e_exp_time = exp_time_ms
-        self.__e_exp_matched = False
-        time_start = time.time()
+        self.__set_expected_exposure(exp_time_ms)
+        deadline = time.monotonic() + self.TIMEOUT_SEC
         self.__zmq_vid_reset()
         while True:
-            self.__zmq_recv()
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            self.__zmq_recv(timeout_ms=min(max(remaining_ms, 0), self.__ZMQ_POLL_MS))
             if self.__e_exp_matched:
                 if self.__is_GSENSE:
+                    # GSENSE frames don't report the set exposure, wait for a few more frames so the
+                    #   frames still in flight with the old exposure are flushed. The old fixed sleep
+                    #   is kept as the upper bound.
                     total_sleep_time = cur_exp_time/1000 + exp_time_ms/1000
-                    time.sleep(total_sleep_time*2+0.5)
-                logger.info(f"Camera - Exposure time set to {exp_time_ms}ms and verified.")
+                    self.__zmq_wait_raw_frames(self.__GSENSE_SETTLE_FRAMES, timeout_s=total_sleep_time*2+0.5)
+                logger.info("Camera - Exposure time set to {}ms and verified.", exp_time_ms)
                 self.cur_exp_time_ms = exp_time_ms
                 break
-            logger.trace(f"Camera - exposure mismatch, expected {exp_time_ms}ms, current {self.__e_exp_time}ms.")
-            if time.time() - time_start > self.TIMEOUT_SEC:
+            logger.trace("Camera - exposure mismatch, expected {}ms, current {}ms.", exp_time_ms, self.__e_exp_time)
+            if time.monotonic() > deadline:
                 # try to set the exposure again
-                logger.warning(f"Camera - exposure mismatch, expected {exp_time_ms}ms, current {self.__e_exp_time}ms.")
+                logger.warning("Camera - exposure mismatch, expected {}ms, current {}ms.", exp_time_ms, self.__e_exp_time)
                 if raise_error:
-                    logger.error(f"ERROR - Camera exposure time not match, timed out!")
+                    logger.error("ERROR - Camera exposure time not match, timed out!")
                     raise bsl_type.DeviceTimeOutError
                 self.set_exposure_ms(exp_time_ms, raise_error=True)
 
@@ -308,11 +389,11 @@ class MantisCamCtrl:
             Enable timestamp only file name mode. No file_name string need to be provided then.
         """
         if time_stamp_only:
-            self.__zmq_send('file', 'file_name', dict([('mode', 'Timestamp')]))
-            logger.info(f'Camera recording filename changed to Timestamp only mode')
+            self.__zmq_send('file', 'file_name', {'mode': 'Timestamp'})
+            logger.info("Camera recording filename changed to Timestamp only mode")
         else:
-            self.__zmq_send('file', 'file_name', dict([('mode', 'Custom'), ('name', file_name)]))
-            logger.info(f'Camera recording filename changed to {file_name}')
+            self.__zmq_send('file', 'file_name', {'mode': 'Custom', 'name': file_name})
+            logger.info("Camera recording filename changed to {}", file_name)
 
 
     def run_auto_exposure(self, frame_name:str='High Gain', sub_frame_type:str='', run_rgb_max_chan:bool=False, min_exp_ms = 1, max_exp_ms = 2500, target_mean = 30000, max_iter = 10, hysterisis=2000):
@@ -359,24 +440,27 @@ class MantisCamCtrl:
         -------
         result : `int`
         """
+        # Last unsaturated (exposure, mean offset) sample, used for the log-domain secant update
+        prev_exp = None
+        prev_mean_offset = None
+        # Longest exposure seen below the target and shortest one seen above it, the answer lies in between
+        exp_lo = None
+        exp_hi = None
         for i in range(max_iter):
             cur_exp = self.__e_exp_time
             
             if run_rgb_max_chan:
+                # Fetch all three channel means from a single frame
                 if self.__is_GSENSE:
-                    r_exp = self.get_frame_mean_name(frame_name, sub_frame_type='red')
-                    g_exp = self.get_frame_mean_name(frame_name, sub_frame_type='green')
-                    b_exp = self.get_frame_mean_name(frame_name, sub_frame_type='blue')
+                    rgb_mean = self.get_frame_mean_name(frame_name, sub_frame_type=['red', 'green', 'blue'])
                 else:
-                    r_exp = self.get_frame_mean_name(frame_name)[0]
-                    g_exp = self.get_frame_mean_name(frame_name)[1]
-                    b_exp = self.get_frame_mean_name(frame_name)[2]
-                cur_mean = max(r_exp, g_exp, b_exp)
+                    rgb_mean = self.get_frame_mean_name(frame_name)[:3]
+                cur_mean = float(np.max(rgb_mean))
             else:
                 if self.__is_GSENSE:
                     cur_mean = self.get_frame_mean_name(frame_name, sub_frame_type=sub_frame_type)
                 else:
-                    cur_mean = np.mean(self.get_frame_mean_name(frame_name))
+                    cur_mean = float(np.mean(self.get_frame_mean_name(frame_name)))
             
             if self.__is_GSENSE:
                 cur_mean_offset = cur_mean - 1100
@@ -386,27 +470,51 @@ class MantisCamCtrl:
                 target_mean_offset = target_mean
 
             if abs(cur_mean - target_mean) < hysterisis:
-                logger.info(f"Auto-Exposure - Target mean {target_mean} value reached @ {cur_mean}!")
+                logger.info("Auto-Exposure - Target mean {} value reached @ {}!", target_mean, cur_mean)
                 return self.cur_exp_time_ms
             
             exp_ratio = target_mean_offset/cur_mean_offset
             if cur_mean > 63000:
                 exp_ratio = 0.2
+            next_exp = round(cur_exp * exp_ratio, 2)
+
+            # Fit mean_offset = k * exp^gamma through the last two samples (a secant step in log-log space)
+            #   and solve it for the target. Fall back to the ratio rule above (gamma = 1) on the first
+            #   iteration, on saturation, or when the fitted response is implausible.
+            if cur_mean <= 63000 and cur_mean_offset > 0:
+                if prev_exp is not None and cur_exp != prev_exp and target_mean_offset > 0:
+                    gamma = (math.log(cur_mean_offset) - math.log(prev_mean_offset)) / (math.log(cur_exp) - math.log(prev_exp))
+                    if 0.25 < gamma < 4:
+                        next_exp = round(cur_exp * (target_mean_offset / cur_mean_offset) ** (1 / gamma), 2)
+                prev_exp = cur_exp
+                prev_mean_offset = cur_mean_offset
+
+            # Keep the step inside the bracket, bisect when the model overshoots it so a bad fit or a
+            #   saturated guess can't make the search oscillate
+            if cur_mean > target_mean:
+                exp_hi = cur_exp if exp_hi is None else min(exp_hi, cur_exp)
+            else:
+                exp_lo = cur_exp if exp_lo is None else max(exp_lo, cur_exp)
+            if exp_lo is not None and exp_hi is not None and not exp_lo < next_exp < exp_hi:
+                next_exp = round((exp_lo + exp_hi) / 2, 2)
 
-            next_exp = np.round(cur_exp * exp_ratio, 2)
-            logger.info(f"Auto-Exposure - Iteration {i+1}/{max_iter}, current exposure: {cur_exp}ms, current mean: {cur_mean}, next exposure: {next_exp}ms")
+            logger.info("Auto-Exposure - Iteration {}/{}, current exposure: {}ms, current mean: {}, next exposure: {}ms", i+1, max_iter, cur_exp, cur_mean, next_exp)
             if next_exp < min_exp_ms:
                 next_exp = min_exp_ms
             if next_exp > max_exp_ms:
                 next_exp = max_exp_ms
 
+            if abs(next_exp - cur_exp) < cur_exp * 0.01:
+                logger.info("Auto-Exposure - Exposure time converged @ {}ms, auto exposure terminated.", cur_exp)
+                return self.cur_exp_time_ms
+
             self.set_exposure_ms(next_exp)
 
             if next_exp == min_exp_ms or next_exp == max_exp_ms:
-                logger.info(f"Auto-Exposure - Exposure time reached the limit, auto exposure terminated.")
+                logger.info("Auto-Exposure - Exposure time reached the limit, auto exposure terminated.")
                 return self.cur_exp_time_ms
             
-        logger.warning(f"Auto-Exposure - ERROR, maximum iteration reached, auto exposure terminated.")
+        logger.warning("Auto-Exposure - ERROR, maximum iteration reached, auto exposure terminated.")
         return self.cur_exp_time_ms
             
         
@@ -431,14 +539,14 @@ class MantisCamCtrl:
         """
         if create_new_folder:
             if time_stamp_only:
-                self.__zmq_send('file', 'folder_name', dict([('mode', 'Timestamp')]))
-                logger.info(f'Camera recording folder name changed to Timestamp only mode.')
+                self.__zmq_send('file', 'folder_name', {'mode': 'Timestamp'})
+                logger.info("Camera recording folder name changed to Timestamp only mode.")
             else:
-                self.__zmq_send('file', 'folder_name', dict([('mode', 'Custom'), ('name', folder_name)]))
-                logger.info(f'Camera recording folder name changed to {folder_name}.')
+                self.__zmq_send('file', 'folder_name', {'mode': 'Custom', 'name': folder_name})
+                logger.info("Camera recording folder name changed to {}.", folder_name)
         else:
-            self.__zmq_send('file', 'folder_name', dict([('mode', 'Do Not Create New Folder')]))
-            logger.info(f"No new folder will be created for the recording files.")
+            self.__zmq_send('file', 'folder_name', {'mode': 'Do Not Create New Folder'})
+            logger.info("No new folder will be created for the recording files.")
 
 
 
@@ -457,32 +565,67 @@ class MantisCamCtrl:
             (default to True)
             Blocking/non-blocking recording select.
             If True: this function will halt until the recording is done and camera is ready again.
-            If False: this function will return as soon as camera started recording.
+            If False: this function will return as soon as camera started recording, use
+            `wait_record_done()` to wait for the recording to finish later.
         """
-        logger.info(f"Camera - Start recording...")
-        # Set the frame per file
-        self.__set_frames_per_file(n_frames)
-        # Set start recording to GUI and file saving process
-        self.__zmq_send('file', 'record', dict(record=True))
-        time_start = time.time()
+        logger.info("Camera - Start recording...")
+        self.__record_started = False
+        # Set the frame per file and start recording to GUI and file saving process in one batch, the
+        #   PUB socket keeps them in order so the frame count is applied before recording starts
+        self.__zmq_send_batch([('file', 'frames_per_file', {'frames_per_file': n_frames}),
+                               ('file', 'record', {'record': True})])
+        deadline = time.monotonic() + 5
         while True:
-            self.__zmq_recv()
-            if self.is_recording:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            self.__zmq_recv(timeout_ms=min(max(remaining_ms, 0), self.__ZMQ_POLL_MS))
+            if self.__record_started:
                 break
-            if time.time() - time_start > 5:
-                logger.error(f"ERROR - Unable to start recording, timed out!")
+            if time.monotonic() > deadline:
+                logger.error("ERROR - Unable to start recording, timed out!")
                 raise bsl_type.DeviceTimeOutError
-        logger.info(f"Camera - Recording with {n_frames} frames per file and exposure time of {self.__e_exp_time}ms.")
+        logger.info("Camera - Recording with {} frames per file and exposure time of {}ms.", n_frames, self.__e_exp_time)
+        self.__record_deadline = time.monotonic() + (self.__e_exp_time * n_frames)/500 + 20
         if wait_until_done:
-            time_start = time.time()
-            while True:
-                self.__zmq_recv()
-                if not self.is_recording:
-                    break
-                if time.time() - time_start > (self.__e_exp_time * n_frames)/500 + 20:
-                    logger.error(f"ERROR - Unable to finish recording, timed out! timeout @ {time.time() - time_start:.0f} seconds.")
-                    # raise bsl_type.DeviceTimeOutError
+            self.wait_record_done()
+
+
+    def wait_record_done(self, timeout_s: float = None) -> bool:
+        """
+        - Wait until the current recording is done and camera is ready again, to be used after
+        `set_start_record(wait_until_done=False)`.
+
+        Parameters
+        ----------
+        timeout_s : `float`
+            (default to None)
+            Maximum time to wait in seconds.
+            If None: wait until the recording is done, an error is logged once the expected
+            recording time (plus 20 seconds) has passed.
+
+        Returns
+        -------
+        done : `bool`
+            True if the recording is done, False if `timeout_s` elapsed first.
+        """
+        time_start = time.monotonic()
+        deadline = self.__record_deadline if timeout_s is None else time_start + timeout_s
+        while self.is_recording:
+            # Recording can last minutes, so wait for up to a second at a time, and only on the command
+            #   socket so the video stream doesn't wake us up on every frame. The video socket is still
+            #   read on every wake so its backlog doesn't build up for the whole recording, the next
+            #   get_frame_mean_name/set_exposure_ms resets it anyway.
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            self.cmd.skt_sub.poll(timeout=min(max(remaining_ms, self.__ZMQ_POLL_MS), self.__ZMQ_RECORD_POLL_MS), flags=zmq.POLLIN)
+            self.__zmq_recv()
+            if not self.is_recording:
+                break
+            if time.monotonic() > deadline:
+                if timeout_s is not None:
+                    return False
+                logger.error("ERROR - Unable to finish recording, timed out! timeout @ {:.0f} seconds.", time.monotonic() - time_start)
+                # raise bsl_type.DeviceTimeOutError
         logger.info("Camera - Recording Finished!")
+        return True
         
 
 
@@ -1,27 +1,59 @@
 from loguru import logger
 from ..headers._bsl_inst_info import _bsl_inst_info_list
 from serial.tools.list_ports import comports
-import serial, subprocess, re, platform, time
+import serial, subprocess, re, platform, time, weakref, threading
+from concurrent.futures import ThreadPoolExecutor
 from ..headers._bsl_type import _bsl_type as bsl_type
 
 logger_opt = logger.opt(ansi=True)
 
+_IS_DARWIN = platform.system() == "Darwin"
+
+# Serial port enumeration can take seconds on Windows/macOS, share one listing between the instruments
+#   constructed back-to-back instead of enumerating the bus again for each of them.
+_PORTS_CACHE_TTL_SEC = 2.0
+_ports_cache = {"t": None, "v": []}
+# Upper bound of ports probed at the same time, each probe mostly waits on the device
+_PROBE_MAX_WORKERS = 8
+# Longest wait for a reply to a probe query, and the polling step used while waiting
+_PROBE_RESP_TIMEOUT_SEC = 0.5
+_PROBE_POLL_SEC = 0.01
+
+def _cached_comports(ttl: float = _PORTS_CACHE_TTL_SEC) -> list:
+    now = time.monotonic()
+    if _ports_cache["t"] is None or now - _ports_cache["t"] >= ttl:
+        _ports_cache["v"] = list(comports())
+        _ports_cache["t"] = now
+    return _ports_cache["v"]
+
+def _close_serial_port(serial_port) -> None:
+    # Finalizer of _bsl_serial, it only holds the port so it never keeps the instance alive
+    if serial_port is not None:
+        try:
+            serial_port.close()
+        except Exception:
+            pass
 
 # @logger_opt.catch
 class _bsl_serial:
-    def __init__(self, target_inst:_bsl_inst_info_list , device_sn:str="") -> None:
+    def __init__(self, target_inst:_bsl_inst_info_list , device_sn:str="", *, parallel_probe:bool=False) -> None:
         logger_opt.info("    Initiating bsl_serial_service...")
         self.device_id=""
         self.inst = target_inst
         self.target_device_sn = device_sn
+        # Opt-in: probe the ports of the brute-force fallback concurrently, see _probe_ports
+        self.parallel_probe = parallel_probe
+        # SN_REG is fixed per instrument, compile it once for all ports and baudrates probed. A plain
+        #   literal S/N doesn't need the regex engine at all, a substring test does the same.
+        self._sn_re = re.compile(self.inst.SN_REG)
+        self._sn_literal = self.inst.SN_REG if re.fullmatch(r"[\w\-]+", self.inst.SN_REG) else None
         self.serial_port = self._connect_serial_device()
+        # Close the port when the instance is collected or at interpreter exit, unless close() ran first
+        self._finalizer = weakref.finalize(self, _close_serial_port, self.serial_port)
         if self.serial_port is None:
             logger_opt.error(f"<light-blue><italic>{self.inst.MODEL} ({self.target_device_sn})</italic></light-blue> not found on serial ports.")
         pass
-              
-    def __del__(self) -> None:
-        self.close()
-        return None
+
 
     def _connect_serial_device(self) -> serial.Serial:
         if self._find_device():
@@ -34,9 +66,15 @@ class _bsl_serial:
     # Return serial port object.
 
         #Aquire all available Serial COM ports.
-        com_ports_list = list(comports())
+        com_ports_list = _cached_comports()
         target_port = None
-        logger_opt.trace(f"    Devices found on bus:{str([port_name[0] for port_name in comports()])}")
+        candidate_ports = []
+        # USB_PID is given in hex, but some platforms report it in decimal, convert it once for all ports
+        try:
+            usb_pid_dec = str(int(self.inst.USB_PID,16))
+        except ValueError:
+            usb_pid_dec = None
+        logger_opt.trace(f"    Devices found on bus:{str([port_name[0] for port_name in com_ports_list])}")
         #Search for target device with the name of the USB device.
         for port in com_ports_list:
             temp_port = None
@@ -46,7 +84,6 @@ class _bsl_serial:
                 temp_port = port[0]
 
             if self.target_device_sn in port[0]:
-                self.device_id = port[0]
                 logger_opt.info(f"    Specified device <light-blue><italic>{self.inst.MODEL}</italic></light-blue> with Serial SN <light-blue><italic>{self.target_device_sn}</italic></light-blue> found on port <light-blue><italic>{port[0]}</italic></light-blue> by Device Serial SN search.")
                 temp_port = port[0]
             
@@ -54,17 +91,15 @@ class _bsl_serial:
                 logger_opt.info(f"    Specified device <light-blue><italic>{self.inst.MODEL}</italic></light-blue> with Serial_Name <light-blue><italic>{self.inst.SERIAL_NAME}</italic></light-blue> found on port <light-blue><italic>{port[0]}</italic></light-blue> by Device name search.")
                 temp_port = port[0]
             
-            if (self.inst.USB_PID in port[2]) or (str(int(self.inst.USB_PID,16)) in port[2]):
+            if (self.inst.USB_PID in port[2]) or (usb_pid_dec is not None and usb_pid_dec in port[2]):
                 logger_opt.info(f"    Specified device <light-blue><italic>{self.inst.MODEL}</italic></light-blue> with USB_PID: <light-blue><italic>{self.inst.USB_PID}</italic></light-blue> found on port <light-blue><italic>{port[0]}</italic></light-blue> by USB_PID search.")
                 temp_port = port[0]
             
             if temp_port is not None:
-                (temp_port, baudrate) = self._check_device_resp(temp_port)
-                if temp_port is not None:
-                    self.baudrate = baudrate
-                    self.serial_port_name = temp_port
-                    return True
-                continue
+                candidate_ports.append(temp_port)
+
+        if self._probe_ports(candidate_ports):
+            return True
 
         if self.target_device_sn != "" and self.inst.MODEL == "USB_520":
             logger_opt.error(f"<light-blue><italic>{self.inst.MODEL} ({self.target_device_sn})</italic></light-blue> not found on serial ports.")
@@ -73,45 +108,88 @@ class _bsl_serial:
         logger.warning(f"    No device found based on USB_PID/VID or Serial Name search!")
         
         # Failed to find device with either USB_PID or device name
-        # Now try to foreach every signle serial device
-        for port in com_ports_list:
-            temp_port = None
-            (temp_port, baudrate) = self._check_device_resp(port[0])
-            if temp_port is not None:
-                self.baudrate = baudrate
-                self.serial_port_name = temp_port
-                return True
+        # Now try to foreach every signle serial device, except the ones that were already probed above
+        #   and didn't answer, each probe costs up to 0.5s per baudrate
+        if self._probe_ports([port[0] for port in com_ports_list if port[0] not in candidate_ports], parallel=self.parallel_probe):
+            return True
         return None
+
+    def _probe_ports(self, port_names:list, parallel:bool=False) -> bool:
+        # Probe the given ports in order and take the first one that answers. Ports after it are never
+        #   opened, as opening a port toggles DTR and the probe writes QUERY_CMD into whatever is there.
+        # With parallel=True up to _PROBE_MAX_WORKERS ports are probed at once, each probe opens its own
+        #   serial.Serial. The same port is picked, but ports after it may be opened and queried too.
+        if len(port_names) == 0:
+            return False
+        executor = None
+        if parallel:
+            # Set once a port answered, the probes still running stop before their next baudrate
+            stop_event = threading.Event()
+            executor = ThreadPoolExecutor(max_workers=min(_PROBE_MAX_WORKERS, len(port_names)))
+            futures = [executor.submit(self._check_device_resp, port_name, stop_event) for port_name in port_names]
+            results = (future.result() for future in futures)
+        else:
+            results = (self._check_device_resp(port_name) for port_name in port_names)
+        try:
+            for (temp_port, baudrate, device_id) in results:
+                if temp_port is not None:
+                    self.baudrate = baudrate
+                    self.serial_port_name = temp_port
+                    if device_id is not None:
+                        self.device_id = device_id
+                    elif self.target_device_sn in temp_port:
+                        self.device_id = temp_port
+                    return True
+            return False
+        finally:
+            if executor is not None:
+                # Drop the probes not started yet and wait for the running ones to stop, so none of them
+                #   still holds its port open or writes queries to it once the lookup returns
+                stop_event.set()
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=True)
                 
-    def _check_device_resp(self, temp_port) -> serial.Serial:
+    def _check_device_resp(self, temp_port, stop_event:threading.Event=None) -> tuple:
+    # Return (port, baudrate, device_id) of a positive match, device_id is None when no S/N was queried.
+    # Return (None, None, None) otherwise, or as soon as stop_event is set.
         # Set baudrate to common baudrates if not provided
         if self.inst.BAUDRATE != 0:
             baudrates = list([self.inst.BAUDRATE])
         else:
             baudrates = list([4800,9600,19200,28800,38400,115200])
+        # The probe commands are the same for every baudrate, encode them once
+        query_cmd = self.inst.QUERY_CMD.encode('utf-8')
+        query_sn_cmd = self.inst.QUERY_SN_CMD.encode('utf-8')
         
         if not self.is_port_free(temp_port):
             logger_opt.warning(f"    BUSY - Device <light-blue><italic>{temp_port}</italic></light-blue> is busy, moving to next available device...")
-            return None,None
+            return None,None,None
 
-        # Try to communicate with the device with each possible baudrate
+        # Try to communicate with the device with each possible baudrate, the port is opened once and
+        #   only its baudrate is changed between attempts
         try:
-            for baudrate in baudrates:
-                logger_opt.info(f"    Inquiring serial port <light-blue><italic>{temp_port}</italic></light-blue> with Baudrate={baudrate}")
-                # Try to open the serial port
-                with serial.Serial(temp_port, baudrate, timeout=0.1) as device:
-                    logger_opt.trace(f"        Connected to <light-blue><italic>{device.name}</italic></light-blue> on port <light-blue><italic>{temp_port}</italic></light-blue>")
+            with serial.Serial(temp_port, baudrates[0], timeout=0.1) as device:
+                logger_opt.trace(f"        Connected to <light-blue><italic>{device.name}</italic></light-blue> on port <light-blue><italic>{temp_port}</italic></light-blue>")
+                for baudrate in baudrates:
+                    if stop_event is not None and stop_event.is_set():
+                        return None,None,None
+                    logger_opt.info(f"    Inquiring serial port <light-blue><italic>{temp_port}</italic></light-blue> with Baudrate={baudrate}")
+                    device.baudrate = baudrate
+                    # Drop whatever was received at the previous baudrate
+                    device.reset_input_buffer()
                     
                     # If no QUERY_CMD is provided, return the port and baudrate
                     if self.inst.QUERY_CMD != "N/A":
                         # Query the device with QUERY_CMD if provided
-                        device.reset_input_buffer()
-                        device.write(bytes(self.inst.QUERY_CMD,'utf-8'))
+                        device.write(query_cmd)
                         logger_opt.trace(f"        Querry <light-blue><italic>{repr(self.inst.QUERY_CMD)}</italic></light-blue> sent to <light-blue><italic>{device.name}</italic></light-blue>")
-                        time.sleep(0.5)
+                        resp_bytes = self._read_response(device, self._is_query_resp_complete)
+                    else:
+                        resp_bytes = device.read(100)
                     resp=""
                     try:
-                        resp = repr(device.read(100).decode("utf-8")).strip('\n\r')
+                        resp = repr(resp_bytes.decode("utf-8")).strip('\n\r')
                     except:
                         resp = "ERROR in interpreting as UTF-8."
                     logger_opt.trace(f"        Response from <light-blue><italic>{device.name}</italic></light-blue>: {resp}")
@@ -119,55 +197,99 @@ class _bsl_serial:
                     # Check if the response contains expected string and s/n number, if true, port found.
                     if self.inst.QUERY_E_RESP in resp:
                         if self.inst.QUERY_SN_CMD == "N/A":
-                            return (temp_port, baudrate) 
+                            return (temp_port, baudrate, None) 
                         
                         logger_opt.info(f"        <light-blue><italic>{self.inst.MODEL}</italic></light-blue> found on serial bus on port <light-blue><italic>{temp_port}</italic></light-blue>.")
                         # Check S/N to confirm matching
                         device.reset_input_buffer() 
-                        device.write(bytes(self.inst.QUERY_SN_CMD,'utf-8'))
+                        device.write(query_sn_cmd)
                         logger_opt.trace(f"        Querry <light-blue><italic>{repr(self.inst.QUERY_SN_CMD)}</italic></light-blue> sent to <light-blue><italic>{device.name}</italic></light-blue>")
-                        time.sleep(0.5)
-                        resp = (device.read(100).decode("utf-8")).strip('\n\r')
+                        resp = (self._read_response(device, self._is_sn_resp_complete).decode("utf-8")).strip('\n\r')
                         logger_opt.trace(f"        Response from <light-blue><italic>{device.name}</italic></light-blue>: {resp}")
                         # Use provided regular expression to extract device S/N number
-                        device_id = re.search(self.inst.SN_REG, resp).group(0)
-                        device.close()
+                        device_id = self._search_sn(resp)
+                        if device_id is None:
+                            logger_opt.warning(f"    S/N Mismatch - Device <light-blue><italic>{temp_port}</italic></light-blue> did not report a S/N, moving to next available device...")
+                            break
                         # Return device_port and current baudrate if a positive match is confirmed
                         if self.target_device_sn in device_id:
-                            self.device_id = device_id.strip('\r\n')
-                            return (temp_port, baudrate) 
+                            return (temp_port, baudrate, device_id.strip('\r\n')) 
                         # Able to confirm device model number, but mismatch S/N number
                         logger_opt.warning(f"    S/N Mismatch - Device <light-blue><italic>{temp_port}</italic></light-blue> with S/N <light-blue><italic>{device_id}</italic></light-blue> found, not <light-blue><italic>{self.target_device_sn}</italic></light-blue> as requested, moving to next available device...")
                         break
-                    device.close()
         except serial.SerialException:
             logger_opt.warning(f"    BUSY - Device <light-blue><italic>{temp_port}</italic></light-blue> is busy, moving to next available device...")
-            return None,None
-        return None,None
+            return None,None,None
+        return None,None,None
+
+    def _search_sn(self, resp:str) -> str:
+    # Extract the device S/N from a response with SN_REG, None if it is not in there.
+        if self._sn_literal is not None:
+            return self._sn_literal if self._sn_literal in resp else None
+        sn_match = self._sn_re.search(resp)
+        return sn_match.group(0) if sn_match is not None else None
+
+    def _read_response(self, device:serial.Serial, is_complete, timeout_sec:float=_PROBE_RESP_TIMEOUT_SEC) -> bytes:
+    # Collect a probe reply as it comes in and return as soon as is_complete(reply so far) holds, instead
+    #   of always sleeping the full timeout. Completeness is judged on content, not on a quiet gap, so a
+    #   device that echoes the command and then pauses before answering still gets the whole timeout.
+    #   Past the timeout, whatever arrives within the serial read timeout is added, like the fixed sleep
+    #   followed by read(100) did before.
+        resp = b""
+        deadline = time.monotonic() + timeout_sec
+        while True:
+            n_waiting = device.in_waiting
+            if n_waiting > 0:
+                resp += device.read(n_waiting)
+                if is_complete(resp.decode("utf-8", errors="replace")):
+                    return resp
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(_PROBE_POLL_SEC)
+        return resp + device.read(100)
+
+    def _is_line_ended(self, resp:str, start:int) -> bool:
+        return "\n" in resp[start:] or "\r" in resp[start:]
+
+    def _is_query_resp_complete(self, resp:str) -> bool:
+    # QUERY_CMD reply is complete once QUERY_E_RESP came in followed by the end of its line
+        idx = resp.find(self.inst.QUERY_E_RESP)
+        return idx >= 0 and self._is_line_ended(resp, idx + len(self.inst.QUERY_E_RESP))
+
+    def _is_sn_resp_complete(self, resp:str) -> bool:
+    # QUERY_SN_CMD reply is complete once a non-empty S/N match came in followed by the end of its line
+        sn_match = self._sn_re.search(resp)
+        return sn_match is not None and sn_match.group(0) != "" and self._is_line_ended(resp, sn_match.end())
 
     def readline(self) -> str:
         resp = self.serial_port.readline().decode("utf-8")
-        logger_opt.trace(f"        {self.inst.MODEL} - com-Serial - Resp from {self.inst.MODEL} with {repr(resp)}")
+        logger_opt.trace("        {} - com-Serial - Resp from {} with {!r}", self.inst.MODEL, self.inst.MODEL, resp)
         return resp.strip('\n\r')
     
     def read(self, n_bytes:int) -> str:
         resp = self.serial_port.read(n_bytes).decode("utf-8")
-        logger_opt.trace(f"        {self.inst.MODEL} - com-Serial - Resp from {self.inst.MODEL} with {repr(resp)}")
+        logger_opt.trace("        {} - com-Serial - Resp from {} with {!r}", self.inst.MODEL, self.inst.MODEL, resp)
         return resp.strip('\n\r')
 
+    def read_bytes(self, n_bytes:int) -> bytes:
+        # Raw read for callers that parse binary replies, no decoding or stripping
+        resp = self.serial_port.read(n_bytes)
+        logger_opt.trace("        {} - com-Serial - Resp from {} with {!r}", self.inst.MODEL, self.inst.MODEL, resp)
+        return resp
+
     def read_all(self) -> bytes:
         resp = self.serial_port.read_all()
-        logger_opt.trace(f"        {self.inst.MODEL} - com-Serial - Resp from {self.inst.MODEL} with {repr(resp)}")
+        logger_opt.trace("        {} - com-Serial - Resp from {} with {!r}", self.inst.MODEL, self.inst.MODEL, resp)
         return resp.strip()
 
     def write(self, msg:str) -> int:
-        logger_opt.trace(f"        {self.inst.MODEL} - com-Serial - Write to {self.inst.MODEL} with {repr(msg)}")
-        return self.serial_port.write(bytes(msg, 'utf-8'))
+        logger_opt.trace("        {} - com-Serial - Write to {} with {!r}", self.inst.MODEL, self.inst.MODEL, msg)
+        return self.serial_port.write(msg.encode('utf-8'))
     
     def writeline(self, msg:str) -> int:
         msg = msg +'\r\n'
-        logger_opt.trace(f"        {self.inst.MODEL} - com-Serial - Write to {self.inst.MODEL} with {repr(msg)}")
-        return self.serial_port.write(bytes(msg, 'utf-8'))
+        logger_opt.trace("        {} - com-Serial - Write to {} with {!r}", self.inst.MODEL, self.inst.MODEL, msg)
+        return self.serial_port.write(msg.encode('utf-8'))
 
     def query(self, cmd:str) -> str:
         self.flush_read_buffer()
@@ -197,15 +319,16 @@ class _bsl_serial:
         :param port_name: Full path to the device, e.g., '/dev/tty.usbserial'.
         :return: True if the port is busy, False otherwise.
         """
-        if platform.system() != "Darwin":
+        if not _IS_DARWIN:
             return True
         
         try:
-            # Use the lsof command to see if the port is open by any process.
-            result = subprocess.run(['lsof', port_name], capture_output=True, text=True)
+            # Use the lsof command to see if the port is open by any process, only listing the PIDs and
+            #   skipping host and port name lookups.
+            result = subprocess.run(['lsof', '-t', '-n', '-P', port_name], capture_output=True, text=True)
 
-            # If the output contains the port name, it's open by some process.
-            if port_name in result.stdout:
+            # If any PID is listed, it's open by some process.
+            if result.stdout.strip() != "":
                 return False
             return True
         except Exception as e:
@@ -215,5 +338,6 @@ class _bsl_serial:
     def close(self) -> None:
         if self.serial_port is not None:
             self.serial_port.close()
+        self._finalizer.detach()
         pass
         
\ No newline at end of file